@@ -1,31 +1,171 @@
 import os
+import re
 import time
 import csv
 import logging
+import functools
+import copy
 from datetime import datetime
+from http.cookiejar import DefaultCookiePolicy
+from operator import itemgetter
+from types import MappingProxyType
 from urllib.parse import urlparse
-from typing import Optional, List, Dict, Tuple, Any # Added typing imports
+from typing import Optional, List, Dict, Tuple, Any, Callable, Mapping, Sequence, TYPE_CHECKING # Added typing imports
 
 import requests
+from requests.adapters import HTTPAdapter
 from requests.exceptions import RequestException, SSLError
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait # Added WebDriverWait
-from selenium.common.exceptions import TimeoutException # Added TimeoutException
-from webdriver_manager.chrome import ChromeDriverManager
+from selenium.common.exceptions import TimeoutException, WebDriverException # Added TimeoutException
 from bs4 import BeautifulSoup
+import soupsieve
 from colorama import init, Fore, Style
 import yaml
 
+# selenium.webdriver and webdriver_manager are imported where the browser is used;
+# importing them here roughly doubles module import time for non-browser callers.
+if TYPE_CHECKING:
+    from selenium import webdriver
+    from selenium.webdriver.support.ui import WebDriverWait
+
+# Prefer the libyaml C loader when PyYAML was built with it
+try:
+    from yaml import CSafeLoader as YamlSafeLoader
+except ImportError:
+    from yaml import SafeLoader as YamlSafeLoader
+
+# Prefer lxml's C tokenizer for BeautifulSoup when it is installed
+try:
+    import lxml # noqa: F401
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
 # Initialise Colorama
 init(autoreset=True)
 
+# --- Configuration Loading ---
+
+# Defaults for every setting; values from config.yaml override these.
+# Read-only so callers can share it without defensive copies; merge with {**DEFAULT_SETTINGS, ...}.
+DEFAULT_SETTINGS: Mapping[str, Any] = MappingProxyType({
+    "input_file": "input_urls.txt",
+    "output_base_dir": "output",
+    "output_subfolder": "metadata_reports",
+    "log_level": "INFO",
+    "headless": True,
+    "window_width": 1440,
+    "window_height": 1080,
+    "request_max_retries": 3,
+    "request_timeout": 10, # seconds
+    "skip_ssl_check_on_error": False,
+    "request_pool_size": 10,
+    "scope_selectors_priority": ("article",), # Candidate content containers, highest priority first
+})
+
+_CONFIG_CACHE: Dict[Tuple[str, int, int], Dict[str, Any]] = {}
+
+
+def _yaml_safe_load(stream: Any) -> Any:
+    """
+    Parses YAML with the fastest available safe loader (libyaml if present).
+
+    Args:
+        stream: An open file or string containing YAML.
+
+    Returns:
+        The parsed YAML document.
+    """
+    return yaml.load(stream, Loader=YamlSafeLoader)
+
+
+def load_configuration_from_dict(config: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Merges the settings mapping from an already-parsed configuration document over the defaults.
+
+    Args:
+        config: The parsed YAML document (may be None for an empty file).
+
+    Returns:
+        DEFAULT_SETTINGS overridden by the document's 'settings' mapping. A missing
+        or malformed mapping yields the defaults.
+    """
+    settings = config.get("settings") if isinstance(config, dict) else None # Use .get for safer access
+    return {**DEFAULT_SETTINGS, **(settings if isinstance(settings, dict) else {})}
+
+
+def parse_scope_selectors(value: Any) -> Tuple[str, ...]:
+    """
+    Normalises the 'scope_selectors_priority' setting to a tuple of valid selectors.
+
+    Args:
+        value: The configured value: a list of CSS selectors or a single selector string.
+
+    Returns:
+        The selectors in priority order. A single string becomes a one-item tuple and
+        selectors that do not compile are dropped. Any other value, or a list with no
+        valid selector left, is logged and replaced by the default.
+    """
+    default = tuple(DEFAULT_SETTINGS["scope_selectors_priority"])
+    if isinstance(value, str):
+        value = (value,) # A bare 'article' is one selector, not seven characters
+    if not (isinstance(value, (list, tuple)) and all(isinstance(selector, str) for selector in value)):
+        logging.error(
+            f"Invalid scope_selectors_priority {value!r}: expected a selector or a list of selectors. "
+            f"Using the default {default!r}."
+        )
+        return default
+
+    valid: List[str] = []
+    invalid: List[str] = []
+    for selector in value:
+        try:
+            soupsieve.compile(selector)
+            valid.append(selector)
+        except soupsieve.SelectorSyntaxError:
+            invalid.append(selector)
+    if invalid:
+        logging.error(f"Ignoring invalid scope selectors {invalid!r} in scope_selectors_priority.")
+    if not valid:
+        logging.error(f"No valid scope selectors configured. Using the default {default!r}.")
+        return default
+    return tuple(valid)
+
+
+def load_configuration(config_path: str = "config.yaml") -> Dict[str, Any]:
+    """
+    Reads and parses a YAML configuration file.
+
+    Results are cached by (absolute path, mtime, size), so repeated loads of an
+    unchanged file skip parsing. Use clear_config_cache() to reset.
+
+    Args:
+        config_path: Path to the YAML configuration file.
+
+    Returns:
+        A fresh copy of the merged settings.
+
+    Raises:
+        FileNotFoundError: If the file does not exist.
+        yaml.YAMLError: If the file is not valid YAML.
+    """
+    stat = os.stat(config_path)
+    cache_key = (os.path.abspath(config_path), stat.st_mtime_ns, stat.st_size)
+    cached = _CONFIG_CACHE.get(cache_key)
+    if cached is None:
+        with open(config_path, "r") as config_file:
+            cached = load_configuration_from_dict(_yaml_safe_load(config_file))
+        _CONFIG_CACHE[cache_key] = cached
+    return copy.deepcopy(cached)
+
+
+def clear_config_cache() -> None:
+    """Forgets every configuration file parsed by load_configuration."""
+    _CONFIG_CACHE.clear()
+
+
 # Load Configuration
 try:
-    with open("config.yaml", "r") as config_file:
-        config = yaml.safe_load(config_file)
-        settings = config.get("settings", {}) # Use .get for safer access
+    settings = load_configuration("config.yaml")
 except FileNotFoundError:
     logging.error("CRITICAL: config.yaml not found. Please create it.")
     exit(1)
@@ -34,24 +174,67 @@ except yaml.YAMLError as e:
     exit(1)
 
 # --- Configuration Variables ---
-# Use .get() with defaults for robustness
-INPUT_FILE: str = settings.get("input_file", "input_urls.txt")
-OUTPUT_BASE_DIR: str = settings.get("output_base_dir", "output")
-OUTPUT_SUBFOLDER: str = settings.get("output_subfolder", "metadata_reports")
-LOG_LEVEL_STR: str = settings.get("log_level", "INFO")
-HEADLESS: bool = settings.get("headless", True)
-WINDOW_WIDTH: int = settings.get("window_width", 1440)
-WINDOW_HEIGHT: int = settings.get("window_height", 1080)
-# Added config options (with defaults)
-REQUEST_MAX_RETRIES: int = settings.get("request_max_retries", 3)
-REQUEST_TIMEOUT: int = settings.get("request_timeout", 10) # seconds
-SKIP_SSL_CHECK_ON_ERROR: bool = settings.get("skip_ssl_check_on_error", False)
+# Defaults are already merged in by load_configuration
+INPUT_FILE: str = settings["input_file"]
+OUTPUT_BASE_DIR: str = settings["output_base_dir"]
+OUTPUT_SUBFOLDER: str = settings["output_subfolder"]
+LOG_LEVEL_STR: str = settings["log_level"]
+HEADLESS: bool = settings["headless"]
+WINDOW_WIDTH: int = settings["window_width"]
+WINDOW_HEIGHT: int = settings["window_height"]
+REQUEST_MAX_RETRIES: int = settings["request_max_retries"]
+REQUEST_TIMEOUT: int = settings["request_timeout"] # seconds
+SKIP_SSL_CHECK_ON_ERROR: bool = settings["skip_ssl_check_on_error"]
+REQUEST_POOL_SIZE: int = settings["request_pool_size"]
 
 
 # --- Configure logging ---
-log_level: int = getattr(logging, LOG_LEVEL_STR.upper(), logging.INFO)
-logging.basicConfig(level=log_level, format='%(asctime)s - %(levelname)s - %(message)s')
-logging.info("Logging configured.")
+
+def setup_logging(log_level_str: str) -> int:
+    """
+    Configures the root logger from a level name.
+
+    Args:
+        log_level_str: Level name such as 'DEBUG' or 'info'. Unknown names fall back to INFO.
+
+    Returns:
+        The numeric logging level that was applied.
+    """
+    level = getattr(logging, log_level_str.upper(), logging.INFO)
+    if not isinstance(level, int):
+        level = logging.INFO # Guard against non-level attributes such as 'BASIC_FORMAT'
+    logging.basicConfig(level=level, format='%(asctime)s - %(levelname)s - %(message)s')
+    logging.info("Logging configured.")
+    return level
+
+
+log_level: int = setup_logging(LOG_LEVEL_STR)
+# Validated after logging is configured so a bad value is reported in the configured format
+SCOPE_SELECTORS_PRIORITY: Tuple[str, ...] = parse_scope_selectors(settings["scope_selectors_priority"])
+
+
+# --- HTTP Session ---
+# One pooled session for all HEAD probes so keep-alive connections are reused
+HTTP_SESSION = requests.Session()
+_http_adapter = HTTPAdapter(pool_connections=REQUEST_POOL_SIZE, pool_maxsize=REQUEST_POOL_SIZE)
+HTTP_SESSION.mount("http://", _http_adapter)
+HTTP_SESSION.mount("https://", _http_adapter)
+# Probes of unrelated sites must not share state: accept no cookies, so none are ever sent
+HTTP_SESSION.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+# Ask for HTML up front; servers that can't provide it answer with their real type, or with
+# 406, in which case the probe is repeated without this header
+HEAD_REQUEST_HEADERS: Dict[str, str] = {"Accept": "text/html,application/xhtml+xml"}
+# Probe answers keyed by (url, verify). Request failures and transient statuses (timeouts,
+# rate limits, 5xx) are not cached, so a URL listed again is re-probed. Entries live for the
+# rest of the process (one crawl); past PROBE_CACHE_MAX_ENTRIES the oldest are dropped.
+PROBE_CACHE_MAX_ENTRIES = 4096
+_TRANSIENT_STATUSES = frozenset({408, 429})
+_PROBE_CACHE: Dict[Tuple[str, bool], Tuple[int, str]] = {}
+
+
+def clear_probe_cache() -> None:
+    """Forgets every result cached by fetch_http_status_and_type."""
+    _PROBE_CACHE.clear()
 
 
 # --- Helper Functions ---
@@ -62,38 +245,57 @@ def fetch_http_status_and_type(
     url: str,
     ssl_decision: Dict[str, bool], # Use mutable dict for state
     max_retries: int = REQUEST_MAX_RETRIES,
-    timeout: int = REQUEST_TIMEOUT
+    timeout: int = REQUEST_TIMEOUT,
+    *,
+    _sleep: Callable[[float], Any] = time.sleep
 ) -> Tuple[Optional[int], Optional[str]]:
     """
-    Fetch the HTTP status code and content type using requests.
+    Fetch the HTTP status code and content type using the shared HTTP session.
 
-    Handles retries and interactive SSL verification skipping.
+    Handles retries and interactive SSL verification skipping. HTTP answers are
+    cached per (url, verify) for the rest of the run, so a URL listed twice is
+    probed once; transient statuses (408, 429, 5xx) and request failures are not
+    cached. Use clear_probe_cache() to reset.
 
     Args:
         url: The URL to fetch.
         ssl_decision: Dictionary tracking user's choice ('skip_all': True/False).
         max_retries: Maximum number of retry attempts.
         timeout: Request timeout in seconds.
+        _sleep: Callable used for the backoff between retries. Tests inject a no-op.
 
     Returns:
         A tuple containing the HTTP status code (int) and content type (str),
         or (None, "Error Description") if fetching fails or user declines SSL skip.
     """
     attempt_verify = not ssl_decision.get("skip_all", False) # Initial verify state
+    cached = _PROBE_CACHE.get((url, attempt_verify))
+    if cached is not None:
+        logging.debug(f"HEAD result for {url} served from cache: {cached}")
+        return cached
+    last_error: Optional[Exception] = None
 
     for attempt in range(max_retries):
         try:
-            response = requests.head(
-                url,
-                allow_redirects=True,
-                timeout=timeout,
-                verify=attempt_verify # Use current attempt's verify state
-            )
+            request_options = {
+                "allow_redirects": True,
+                "timeout": timeout,
+                "verify": attempt_verify, # Use current attempt's verify state
+            }
+            response = HTTP_SESSION.head(url, headers=HEAD_REQUEST_HEADERS, **request_options)
+            if response.status_code == 406:
+                # No HTML on offer; ask again without Accept so the report records the real status
+                response = HTTP_SESSION.head(url, **request_options)
             http_code: int = response.status_code
-            content_type: str = response.headers.get("Content-Type", "Unknown").split(";")[0]
+            content_type: str = response.headers.get("Content-Type", "Unknown").partition(";")[0]
             logging.debug(f"HEAD request for {url} successful: {http_code}, {content_type}")
+            if http_code < 500 and http_code not in _TRANSIENT_STATUSES:
+                if len(_PROBE_CACHE) >= PROBE_CACHE_MAX_ENTRIES:
+                    del _PROBE_CACHE[next(iter(_PROBE_CACHE))] # Oldest first: dicts keep insertion order
+                _PROBE_CACHE[(url, attempt_verify)] = (http_code, content_type)
             return http_code, content_type
         except SSLError as ssl_err:
+            last_error = ssl_err
             logging.error(f"SSL error for {url} on attempt {attempt + 1}: {ssl_err}")
 
             # Check if we should ask the user or if they already said yes
@@ -118,42 +320,86 @@ def fetch_http_status_and_type(
                  # No time.sleep here, immediately retry in the next loop iteration
 
         except RequestException as e:
+            last_error = e
             logging.warning(f"Request error for {url} on attempt {attempt + 1}: {e}")
             if attempt < max_retries - 1:
-                time.sleep(2 ** attempt) # Exponential backoff before retry
+                _sleep(2 ** attempt) # Exponential backoff before retry
             else:
                 logging.error(f"Failed to fetch {url} after {max_retries} attempts due to RequestException.")
                 return None, "Request Error"
         except Exception as e: # Catch any other unexpected errors
+             last_error = e
              logging.error(f"Unexpected error fetching HEAD for {url} on attempt {attempt + 1}: {e}")
              if attempt < max_retries - 1:
-                 time.sleep(2 ** attempt)
+                 _sleep(2 ** attempt)
              else:
                  return None, "Unknown Error"
 
-        # --- Important: Only sleep if it wasn't an SSL error we are immediately retrying ---
-        # (Prevents double sleep: one here, one if RequestException follows the SSL retry)
-        # We only reach here after the except blocks if we need to retry (and it wasn't an SSLError where user said 'y')
-        if attempt < max_retries - 1:
-             # Check if we are about to retry an SSLError without verify (user said 'y')
-             # In this specific case, we don't sleep here because the loop will immediately retry.
-             # We only sleep for non-SSL errors or if user said 'n' to SSL skip (which returns).
-             if not isinstance(ssl_err, SSLError) or not ssl_decision.get("skip_all", False):
-                 time.sleep(2 ** attempt) # Exponential backoff only for non-SSL retries
-
+        # Backoff already happened in the except blocks above; SSL retries after a skip run immediately
 
     logging.error(f"All {max_retries} attempts failed for {url}.")
     # Determine final error type if loop finishes
     final_error = "Fetch Failed"
-    if isinstance(ssl_err, SSLError) and not ssl_decision.get("skip_all", False):
+    if isinstance(last_error, SSLError) and not ssl_decision.get("skip_all", False):
         final_error = "SSL Error (User Declined Skip or Retries Failed)"
-    elif isinstance(ssl_err, SSLError):
+    elif isinstance(last_error, SSLError):
         final_error = "SSL Error (Retries Failed After Skip)"
 
     return None, final_error
 
 
-def fetch_and_parse_html(url: str, driver: webdriver.Chrome, page_load_timeout: int = 30) -> Optional[BeautifulSoup]:
+# Resource timing entries only appear once a request has finished, so in-flight requests are
+# invisible. Instead, report idle once the count of finished requests is unchanged since the
+# previous poll. The count is kept on the page's window, so it resets with every navigation.
+_NETWORK_IDLE_SCRIPT = """
+const count = performance.getEntriesByType('resource').length;
+const idle = window.__pageDetailsResourceCount === count;
+window.__pageDetailsResourceCount = count;
+return idle;
+"""
+
+
+def _document_complete(driver: "webdriver.Chrome") -> bool:
+    """WebDriverWait condition: the document's readyState is 'complete'."""
+    return driver.execute_script("return document.readyState") == "complete"
+
+
+def _network_idle(driver: "webdriver.Chrome") -> bool:
+    """WebDriverWait condition: no resource request finished since the previous poll."""
+    return bool(driver.execute_script(_NETWORK_IDLE_SCRIPT))
+
+
+def _get_driver_wait(driver: "webdriver.Chrome", timeout: float) -> "WebDriverWait":
+    """
+    Returns a WebDriverWait for the driver, reusing one per (driver, timeout).
+
+    The waits are cached on the driver itself, so a crawl that reuses one browser
+    builds each of them once instead of once per URL.
+
+    Args:
+        driver: The Selenium WebDriver instance.
+        timeout: Maximum time in seconds the wait polls for.
+
+    Returns:
+        The cached WebDriverWait.
+    """
+    waits = getattr(driver, "_driver_waits", None)
+    if waits is None:
+        waits = driver._driver_waits = {}
+    wait = waits.get(timeout)
+    if wait is None:
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        wait = waits[timeout] = WebDriverWait(driver, timeout)
+    return wait
+
+
+def fetch_and_parse_html(
+    url: str,
+    driver: "webdriver.Chrome",
+    page_load_timeout: int = 30,
+    settle_timeout: float = 1.0
+) -> Optional[BeautifulSoup]:
     """
     Fetches HTML content using Selenium, waits for page load, parses with BeautifulSoup.
 
@@ -161,6 +407,9 @@ def fetch_and_parse_html(url: str, driver: webdriver.Chrome, page_load_timeout:
         url: The URL to fetch.
         driver: The Selenium WebDriver instance.
         page_load_timeout: Maximum time in seconds to wait for page load state.
+        settle_timeout: Maximum time in seconds to wait for resource requests to
+                        stop finishing after load. Returns early once no request
+                        finishes between two polls of the wait.
 
     Returns:
         A BeautifulSoup object of the page source, or None if fetching/parsing fails.
@@ -168,13 +417,17 @@ def fetch_and_parse_html(url: str, driver: webdriver.Chrome, page_load_timeout:
     try:
         driver.get(url)
         # Wait for the document.readyState to be 'complete'
-        WebDriverWait(driver, page_load_timeout).until(
-            lambda d: d.execute_script("return document.readyState") == "complete"
-        )
+        _get_driver_wait(driver, page_load_timeout).until(_document_complete)
         logging.debug(f"Page state 'complete' reached for {url}")
-        # Optional short sleep respecting potential rate limits after load confirmed
-        time.sleep(1)
-        return BeautifulSoup(driver.page_source, "html.parser")
+        # Give late resources a bounded chance to finish instead of sleeping a fixed second.
+        # Best effort: the page is already complete, so a failed idle check never loses it.
+        try:
+            _get_driver_wait(driver, settle_timeout).until(_network_idle)
+        except TimeoutException:
+            logging.debug(f"Network still busy after {settle_timeout}s for {url}; parsing current DOM")
+        except WebDriverException as e:
+            logging.debug(f"Network idle check failed for {url} ({e}); parsing current DOM")
+        return BeautifulSoup(driver.page_source, HTML_PARSER)
     except TimeoutException:
         logging.error(f"Timeout ({page_load_timeout}s) waiting for page load state 'complete' for {url}")
         return None
@@ -220,6 +473,88 @@ def extract_meta_title(soup: BeautifulSoup) -> str:
         return ""
 
 
+_TAG_NAME_RE = re.compile(r"[A-Za-z][A-Za-z0-9-]*")
+
+
+@functools.lru_cache(maxsize=64)
+def _compile_selector(selector: str) -> soupsieve.SoupSieve:
+    """
+    Compiles a CSS selector once and caches it for reuse across pages.
+
+    Args:
+        selector: The CSS selector string.
+
+    Returns:
+        The compiled soupsieve matcher. Raises soupsieve.SelectorSyntaxError if invalid.
+    """
+    return soupsieve.compile(selector)
+
+
+def _select_scope(soup: BeautifulSoup, scope_selector: Optional[str]) -> Optional[Any]:
+    """
+    Resolves the scope element for the extractors.
+
+    Args:
+        soup: BeautifulSoup object of the page.
+        scope_selector: CSS selector for the scope. If None, the whole document is the scope.
+
+    Returns:
+        The first element matching the selector, the soup itself if no selector
+        is given, or None if nothing matches.
+    """
+    if not scope_selector:
+        return soup
+    if _TAG_NAME_RE.fullmatch(scope_selector):
+        # Plain tag names skip the CSS engine; parsed HTML tag names are lowercase
+        return soup.find(scope_selector.lower())
+    return _compile_selector(scope_selector).select_one(soup)
+
+
+def find_content_scope(soup: BeautifulSoup, priority_list: Optional[Sequence[str]] = None) -> Optional[str]:
+    """
+    Finds the highest-priority content container selector present on the page.
+
+    All candidate selectors are combined into one group selector so the document
+    is walked once rather than once per candidate.
+
+    Args:
+        soup: BeautifulSoup object of the page.
+        priority_list: CSS selectors in priority order, already validated (see
+                       parse_scope_selectors). Defaults to the
+                       'scope_selectors_priority' setting.
+
+    Returns:
+        The first selector in priority order that matches an element, or None
+        (also on error, e.g. an invalid selector).
+    """
+    if priority_list is None:
+        priority_list = SCOPE_SELECTORS_PRIORITY
+    selectors = list(priority_list)
+    if not selectors:
+        return None
+
+    try:
+        if all(_TAG_NAME_RE.fullmatch(selector) for selector in selectors):
+            # Plain tag names: one name-matched pass, no CSS engine needed
+            ranks = {selector.lower(): index for index, selector in reversed(list(enumerate(selectors)))}
+            found = {element.name for element in soup.find_all(list(ranks))}
+            best = min((ranks[name] for name in found), default=None)
+            return selectors[best] if best is not None else None
+
+        best_index: Optional[int] = None
+        for element in _compile_selector(", ".join(selectors)).iselect(soup):
+            for index, selector in enumerate(selectors[:best_index]):
+                if _compile_selector(selector).match(element):
+                    best_index = index
+                    break
+            if best_index == 0:
+                break # Nothing can beat the top priority selector
+        return selectors[best_index] if best_index is not None else None
+    except Exception as e:
+        logging.warning(f"Error finding content scope: {e}")
+        return None
+
+
 def extract_h1(soup: BeautifulSoup, scope_selector: Optional[str] = "article") -> str:
     """
     Extract the text of the first H1 tag, optionally within a specific scope.
@@ -233,7 +568,7 @@ def extract_h1(soup: BeautifulSoup, scope_selector: Optional[str] = "article") -
         The H1 text, or an empty string if not found or on error.
     """
     try:
-        scope = soup.find(scope_selector) if scope_selector else soup
+        scope = _select_scope(soup, scope_selector)
         if scope:
             h1 = scope.find("h1")
             return h1.text.strip() if h1 else ""
@@ -256,13 +591,40 @@ def count_tags(soup: BeautifulSoup, tags: List[str], scope_selector: Optional[st
         The count of the specified tags, or 0 on error or if scope not found.
     """
     try:
-        scope = soup.find(scope_selector) if scope_selector else soup
-        return len(scope.find_all(tags)) if scope else 0
+        scope = _select_scope(soup, scope_selector)
+        if not scope:
+            return 0
+        # One walk with a set lookup per node; find_all runs a name-matching callback per node
+        wanted = frozenset(tags)
+        return sum(1 for element in scope.descendants if element.name in wanted)
     except Exception as e:
         logging.warning(f"Error counting tags '{tags}' within scope '{scope_selector}': {e}")
         return 0
 
 
+_SKIPPED_HREF_PREFIXES = ("#", "mailto:", "tel:")
+
+
+def _classify_link(href: str, base_domain: str) -> Optional[bool]:
+    """
+    Classifies a link href as internal or external relative to a base domain.
+
+    Args:
+        href: The href attribute value.
+        base_domain: The netloc of the page being analyzed.
+
+    Returns:
+        True for internal, False for external, or None for links that are not
+        counted (empty, anchors, mailto, tel).
+    """
+    if not href or href.startswith(_SKIPPED_HREF_PREFIXES):
+        return None # Skip anchors, mailto, tel links
+
+    link_domain = urlparse(href).netloc
+    # Simple check: same domain is internal, different or empty is external
+    return base_domain in href or (not link_domain and (href.startswith('/') or not href.startswith('http')))
+
+
 def count_links(soup: BeautifulSoup, base_url: str, internal: bool, scope_selector: Optional[str] = "article") -> int:
     """
     Counts internal or external links within an optional scope.
@@ -278,7 +640,7 @@ def count_links(soup: BeautifulSoup, base_url: str, internal: bool, scope_select
     """
     count = 0
     try:
-        scope = soup.find(scope_selector) if scope_selector else soup
+        scope = _select_scope(soup, scope_selector)
         if not scope:
             return 0
 
@@ -286,17 +648,8 @@ def count_links(soup: BeautifulSoup, base_url: str, internal: bool, scope_select
         links = scope.find_all("a", href=True)
 
         for link in links:
-            href = link["href"]
-            if not href or href.startswith("#") or href.startswith("mailto:") or href.startswith("tel:"):
-                continue # Skip anchors, mailto, tel links
-
-            link_domain = urlparse(href).netloc
-            # Simple check: same domain is internal, different or empty is external
-            is_internal = base_domain in href or (not link_domain and (href.startswith('/') or not href.startswith('http')))
-
-            if internal and is_internal:
-                count += 1
-            elif not internal and not is_internal:
+            is_internal = _classify_link(link["href"], base_domain)
+            if is_internal is not None and is_internal == internal:
                 count += 1
         return count
     except Exception as e:
@@ -316,7 +669,7 @@ def count_images_no_alt(soup: BeautifulSoup, scope_selector: Optional[str] = "ar
         The count of images without proper alt text, or 0 on error or if scope not found.
     """
     try:
-        scope = soup.find(scope_selector) if scope_selector else soup
+        scope = _select_scope(soup, scope_selector)
         if not scope:
             return 0
         images = scope.find_all("img")
@@ -327,6 +680,66 @@ def count_images_no_alt(soup: BeautifulSoup, scope_selector: Optional[str] = "ar
         return 0
 
 
+_HEADING_TAGS = frozenset({"h1", "h2", "h3", "h4", "h5", "h6"})
+
+
+def gather_article_stats(soup: BeautifulSoup, base_url: str, scope_selector: Optional[str] = "article") -> Dict[str, Any]:
+    """
+    Collects all "Article" column values with a single walk of the scope.
+
+    Equivalent to calling extract_h1, count_tags (headings and images), count_links
+    (internal and external) and count_images_no_alt, but visits each descendant once.
+
+    Args:
+        soup: BeautifulSoup object of the page.
+        base_url: The base URL of the page being analyzed (for domain comparison).
+        scope_selector: CSS selector for the scope. If None, searches the whole document.
+
+    Returns:
+        A dictionary keyed by the "Article ..." CSV column names. Values are
+        empty/zero if the scope is not found or on error.
+    """
+    stats: Dict[str, Any] = {
+        "Article H1": "", "Article Headings": 0,
+        "Article Links Internal": 0, "Article Links External": 0,
+        "Article Images": 0, "Article Images NoAlt": 0,
+    }
+    try:
+        scope = _select_scope(soup, scope_selector)
+        if not scope:
+            return stats
+
+        base_domain = urlparse(base_url).netloc
+        first_h1 = None
+        for element in scope.descendants:
+            name = element.name
+            if name is None:
+                continue # NavigableString
+            if name in _HEADING_TAGS:
+                stats["Article Headings"] += 1
+                if first_h1 is None and name == "h1":
+                    first_h1 = element
+            elif name == "a":
+                href = element.get("href")
+                is_internal = _classify_link(href, base_domain) if href is not None else None
+                if is_internal is True:
+                    stats["Article Links Internal"] += 1
+                elif is_internal is False:
+                    stats["Article Links External"] += 1
+            elif name == "img":
+                stats["Article Images"] += 1
+                if not element.get("alt", "").strip():
+                    stats["Article Images NoAlt"] += 1
+
+        if first_h1 is not None:
+            stats["Article H1"] = first_h1.text.strip()
+        return stats
+    except Exception as e:
+        logging.warning(f"Error gathering article stats within scope '{scope_selector}': {e}")
+        return stats
+
+
+@functools.lru_cache(maxsize=4096)
 def extract_page_slug(url: str) -> str:
     """
     Extract the page slug (last part of the path) from the URL.
@@ -343,17 +756,50 @@ def extract_page_slug(url: str) -> str:
         if not path or path == "/":
             return "homepage"
         # Get the last non-empty part of the path
-        slug = path.rstrip("/").split("/")[-1]
+        slug = path.rstrip("/").rpartition("/")[2]
         return slug if slug else "unknown" # Fallback if split results in empty
     except Exception as e:
         logging.warning(f"Error extracting page slug from {url}: {e}")
         return "unknown"
 
 
+def _get_body_class_index(body: Any) -> Dict[str, str]:
+    """
+    Builds (or reuses) a lookup of dash-terminated class prefixes to their values.
+
+    'page-id-123' is indexed under both 'page-' and 'page-id-'. The first class
+    in document order wins, matching a linear scan of the class list. The index
+    is cached on the body tag and rebuilt whenever its class list changes.
+
+    Args:
+        body: The <body> Tag of the page.
+
+    Returns:
+        A dictionary mapping each prefix to the stripped class value.
+    """
+    classes = tuple(body["class"]) # Snapshot by value, so in-place edits to the list invalidate the index
+    cached = vars(body).get("_body_class_index")
+    if cached and cached[0] == classes:
+        return cached[1]
+
+    index: Dict[str, str] = {}
+    for cls in classes:
+        end = cls.find("-")
+        while end != -1:
+            prefix = cls[:end + 1]
+            index.setdefault(prefix, cls.replace(prefix, "").strip())
+            end = cls.find("-", end + 1)
+    body._body_class_index = (classes, index)
+    return index
+
+
 def extract_body_class(soup: BeautifulSoup, prefix: str, default: Optional[str] = None) -> Optional[str]:
     """
     Extracts the value of a specific class prefixed class from the body tag.
 
+    Prefixes ending in '-' are answered from a per-soup index, so repeated
+    lookups against the same page do not re-scan the class list.
+
     Args:
         soup: BeautifulSoup object of the page.
         prefix: The prefix of the class name to find (e.g., 'page-id-').
@@ -365,6 +811,9 @@ def extract_body_class(soup: BeautifulSoup, prefix: str, default: Optional[str]
     try:
         body = soup.body
         if body and body.has_attr("class"):
+            if prefix.endswith("-"):
+                index = _get_body_class_index(body)
+                return index.get(prefix, default)
             for cls in body["class"]:
                 if cls.startswith(prefix):
                     return cls.replace(prefix, "").strip()
@@ -374,6 +823,35 @@ def extract_body_class(soup: BeautifulSoup, prefix: str, default: Optional[str]
         return default
 
 
+def extract_body_classes(soup: BeautifulSoup, prefix_defaults: Dict[str, Optional[str]]) -> Dict[str, Optional[str]]:
+    """
+    Extracts several prefixed body class values in one pass over the class list.
+
+    Args:
+        soup: BeautifulSoup object of the page.
+        prefix_defaults: Mapping of class prefix (e.g., 'page-id-') to the value
+                         returned when that prefix is not found.
+
+    Returns:
+        A dictionary mapping each prefix to its class value or its default.
+    """
+    results = dict(prefix_defaults)
+    try:
+        body = soup.body
+        if not body or not body.has_attr("class"):
+            return results
+        index = _get_body_class_index(body)
+        for prefix, default in prefix_defaults.items():
+            if prefix.endswith("-"):
+                results[prefix] = index.get(prefix, default)
+            else:
+                results[prefix] = extract_body_class(soup, prefix, default=default)
+        return results
+    except Exception as e:
+        logging.warning(f"Error extracting body classes with prefixes {list(prefix_defaults)}: {e}")
+        return results
+
+
 def extract_placeholder_data(soup: BeautifulSoup, data_type: str) -> Optional[Any]:
     """Placeholder function for future data extraction."""
     logging.debug(f"Placeholder function called for {data_type}. Needs implementation.")
@@ -386,7 +864,7 @@ def extract_placeholder_data(soup: BeautifulSoup, data_type: str) -> Optional[An
 
 def extract_metadata(
     url: str,
-    driver: webdriver.Chrome,
+    driver: "webdriver.Chrome",
     ssl_decision: Dict[str, bool] # Accept the decision state
 ) -> Optional[Dict[str, Any]]:
     """
@@ -442,7 +920,7 @@ def extract_metadata(
             return base_data
 
         # --- Extract detailed data if HTML is available ---
-        article_scope = "article"
+        article_scope = find_content_scope(soup) or "article"
 
         meta_data = {
             "Title": extract_meta_title(soup),
@@ -454,18 +932,12 @@ def extract_metadata(
             "Opengraph description": extract_meta_content(soup, "og:description"),
         }
 
-        article_data = {
-            "Article H1": extract_h1(soup, scope_selector=article_scope),
-            "Article Headings": count_tags(soup, ["h1", "h2", "h3", "h4", "h5", "h6"], scope_selector=article_scope),
-            "Article Links Internal": count_links(soup, url, internal=True, scope_selector=article_scope),
-            "Article Links External": count_links(soup, url, internal=False, scope_selector=article_scope),
-            "Article Images": count_tags(soup, ["img"], scope_selector=article_scope),
-            "Article Images NoAlt": count_images_no_alt(soup, scope_selector=article_scope),
-        }
+        article_data = gather_article_stats(soup, url, scope_selector=article_scope)
 
+        body_classes = extract_body_classes(soup, {"page-id-": None, "parent-pageid-": "0"})
         other_data = {
-            "Page-id": extract_body_class(soup, "page-id-"),
-            "Parent-ID": extract_body_class(soup, "parent-pageid-", default="0"),
+            "Page-id": body_classes["page-id-"],
+            "Parent-ID": body_classes["parent-pageid-"],
             "content-count": extract_placeholder_data(soup, "content-count"),
             "content-ratio": extract_placeholder_data(soup, "content-ratio"),
         }
@@ -480,39 +952,42 @@ def extract_metadata(
 
 # --- File Operations ---
 
-def read_input_file(input_file_path: str) -> List[str]:
+def read_input_file(input_file_path: str, *, _open: Callable[..., Any] = open) -> List[str]:
     """
     Reads URLs from a specified input file, one URL per line.
     If the initial path is invalid, prompts the user for a correct path.
 
     Args:
         input_file_path: The initial path to the input file (from config).
+        _open: Callable used to open the file. Tests inject an in-memory opener.
 
     Returns:
         A list of valid URLs found in the file. Returns empty list on critical error.
     """
     current_path = input_file_path
-    # --- Added check and interactive prompt ---
-    while not os.path.exists(current_path):
-        logging.warning(f"Input file specified in config not found: {current_path}")
-        print(Fore.YELLOW + f"Input file specified ('{current_path}') not found.")
-        new_path = input(Fore.CYAN + "Please enter the correct path to the input URL file: ").strip()
-        # Basic check if the user provided any input
-        if not new_path:
-             print(Fore.RED + "No path entered. Exiting.")
-             return [] # Exit if user provides no path
-        current_path = new_path
-    # --- End of added check ---
-
     urls: List[str] = []
     try:
-        with open(current_path, "r", encoding="utf-8") as file:
-            for line in file:
-                url = line.strip()
-                if url and urlparse(url).scheme in ["http", "https"]: # Basic URL validation
-                    urls.append(url)
-                elif url:
-                    logging.warning(f"Skipping invalid or non-HTTP(S) line in input file: {url}")
+        # Open first and prompt only on failure (EAFP): one syscall instead of stat + open
+        while True:
+            try:
+                with _open(current_path, "r", encoding="utf-8") as file:
+                    lines = file.read().splitlines() # One read instead of per-line iteration
+                break
+            except FileNotFoundError:
+                logging.warning(f"Input file specified in config not found: {current_path}")
+                print(Fore.YELLOW + f"Input file specified ('{current_path}') not found.")
+                new_path = input(Fore.CYAN + "Please enter the correct path to the input URL file: ").strip()
+                # Basic check if the user provided any input
+                if not new_path:
+                     print(Fore.RED + "No path entered. Exiting.")
+                     return [] # Exit if user provides no path
+                current_path = new_path
+        for line in lines:
+            url = line.strip()
+            if url and urlparse(url).scheme in ("http", "https"): # Basic URL validation
+                urls.append(url)
+            elif url:
+                logging.warning(f"Skipping invalid or non-HTTP(S) line in input file: {url}")
         logging.info(f"Read {len(urls)} valid URLs from {current_path}")
         return urls
     except IOError as e:
@@ -525,6 +1000,10 @@ def read_input_file(input_file_path: str) -> List[str]:
         return []
 
 
+_DOMAIN_UNSAFE_RE = re.compile(r"[.:/]")
+
+
+@functools.lru_cache(maxsize=4096)
 def sanitise_domain(url: str) -> str:
     """
     Extracts and sanitises the domain name from a URL for use in filenames.
@@ -537,22 +1016,34 @@ def sanitise_domain(url: str) -> str:
     """
     try:
         domain = urlparse(url).netloc
-        # Replace common invalid filename characters
-        sanitised = domain.replace(".", "_").replace(":", "_").replace("/", "_")
+        # Replace common invalid filename characters in one pass
+        sanitised = _DOMAIN_UNSAFE_RE.sub("_", domain)
         return sanitised if sanitised else "unknown_domain"
     except Exception as e:
         logging.warning(f"Error sanitising domain for {url}: {e}")
         return "unknown_domain"
 
 
-def write_to_csv(file_path: str, data: List[Dict[str, Any]], fieldnames: List[str]) -> None:
+# CSV header row and column order for the metadata report
+CSV_FIELDNAMES: Tuple[str, ...] = (
+    "http-code", "http-type", "Page-URL", "page-slug", "Page-id", "Parent-ID",
+    "Title", "Description", "Keywords",
+    "Opengraph type", "Opengraph image", "Opengraph title", "Opengraph description",
+    "Article H1", "Article Headings", "Article Links Internal", "Article Links External",
+    "Article Images", "Article Images NoAlt",
+    "content-count", "content-ratio",
+    "Parent-URL", "IA error",
+)
+
+
+def write_to_csv(file_path: str, data: List[Dict[str, Any]], fieldnames: Sequence[str]) -> None:
     """
     Writes a list of dictionaries to a CSV file.
 
     Args:
         file_path: The full path to the output CSV file.
         data: A list of dictionaries, where each dictionary represents a row.
-        fieldnames: A list of strings defining the header row and column order.
+        fieldnames: Column names defining the header row and column order.
     """
     if not data:
         logging.warning("No data to write to CSV.")
@@ -560,11 +1051,21 @@ def write_to_csv(file_path: str, data: List[Dict[str, Any]], fieldnames: List[st
     try:
         # Ensure the output directory exists
         os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        project = itemgetter(*fieldnames)
+        single_column = len(fieldnames) == 1
+
+        def to_row(record: Dict[str, Any]) -> Sequence[Any]:
+            # Extra keys are ignored; rows missing columns (e.g. error rows) get blanks
+            try:
+                values = project(record)
+            except KeyError:
+                return [record.get(name, "") for name in fieldnames]
+            return (values,) if single_column else values
+
         with open(file_path, "w", newline="", encoding="utf-8") as csvfile:
-            # Use extrasaction='ignore' if data dicts might have extra keys
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames, extrasaction='ignore')
-            writer.writeheader()
-            writer.writerows(data)
+            writer = csv.writer(csvfile)
+            writer.writerow(fieldnames)
+            writer.writerows(map(to_row, data))
         logging.info(f"Successfully wrote {len(data)} rows to {file_path}")
     except IOError as e:
         logging.error(f"Error writing to CSV file {file_path}: {e}")
@@ -614,6 +1115,11 @@ def main() -> None:
     logging.info(f"Output CSV will be saved to: {output_path}")
 
     # --- Configure Selenium WebDriver ---
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+    from selenium.webdriver.chrome.options import Options
+    from webdriver_manager.chrome import ChromeDriverManager
+
     options = Options()
     if HEADLESS:
         options.add_argument('--headless=new') # Use modern headless
@@ -622,7 +1128,7 @@ def main() -> None:
     options.add_argument('--disable-dev-shm-usage')
     options.add_argument(f'--window-size={WINDOW_WIDTH},{WINDOW_HEIGHT}')
 
-    driver: Optional[webdriver.Chrome] = None # Initialize driver variable
+    driver: Optional["webdriver.Chrome"] = None # Initialize driver variable
     metadata_list: List[Dict[str, Any]] = []
     # --- Initialize SSL decision state ---
     ssl_decision: Dict[str, bool] = {"skip_all": False} # Tracks if user said 'y'
@@ -645,19 +1151,8 @@ def main() -> None:
                  logging.error(f"Critical failure processing {url}, adding basic error row.")
 
 
-        # --- Define CSV Headers ---
-        fieldnames = [
-            "http-code", "http-type", "Page-URL", "page-slug", "Page-id", "Parent-ID",
-            "Title", "Description", "Keywords",
-            "Opengraph type", "Opengraph image", "Opengraph title", "Opengraph description",
-            "Article H1", "Article Headings", "Article Links Internal", "Article Links External",
-            "Article Images", "Article Images NoAlt",
-            "content-count", "content-ratio",
-            "Parent-URL", "IA error",
-        ]
-
         # --- Write Results ---
-        write_to_csv(output_path, metadata_list, fieldnames)
+        write_to_csv(output_path, metadata_list, CSV_FIELDNAMES)
         print(Fore.CYAN + f"\nMetadata saved to {output_path}")
 
     except Exception as e:
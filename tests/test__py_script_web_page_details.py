@@ -1,28 +1,177 @@
+import csv
+import http.client
+import io
+import logging
+from types import SimpleNamespace
 import pytest
 from src import py_script_web_page_details as script_to_test  # Import your functions
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 from urllib.parse import urlparse
 
 # Mocking (very important for testing web requests!)
-from unittest.mock import patch
+from unittest.mock import MagicMock
 import requests
+from requests.adapters import HTTPAdapter
+from selenium.common.exceptions import JavascriptException
 
+# Parse test documents with the same tree builder the script uses (lxml when installed)
+HTML_PARSER = script_to_test.HTML_PARSER
 
-def test_extract_page_slug():
+
+@pytest.mark.parametrize("config,overrides", [
+    ({"settings": {"input_file": "urls.txt", "headless": False}}, {"input_file": "urls.txt", "headless": False}),
+    ({"settings": None}, {}),
+    ({"other": 1}, {}),
+    (None, {}),  # Empty YAML file
+    (["not", "a", "mapping"], {}),
+])
+def test_load_configuration_from_dict(config, overrides):
+    """Tests for load_configuration_from_dict function."""
+    assert script_to_test.load_configuration_from_dict(config) == {**script_to_test.DEFAULT_SETTINGS, **overrides}
+
+
+def test_default_settings_read_only():
+    """DEFAULT_SETTINGS cannot be mutated by callers."""
+    with pytest.raises(TypeError):
+        script_to_test.DEFAULT_SETTINGS["input_file"] = "other.txt"
+
+
+@pytest.mark.parametrize("value,expected", [
+    (["main", "article"], ("main", "article")),
+    (("main",), ("main",)),
+    ("article", ("article",)),  # A single selector, not its characters
+])
+def test_parse_scope_selectors(value, expected):
+    """Tests for parse_scope_selectors function."""
+    assert script_to_test.parse_scope_selectors(value) == expected
+
+
+def test_parse_scope_selectors_drops_invalid(caplog):
+    """Selectors that do not compile are dropped once, at load time, with one error."""
+    with caplog.at_level(logging.ERROR):
+        assert script_to_test.parse_scope_selectors(["main[", "article", "div[["]) == ("article",)
+    assert [record.getMessage() for record in caplog.records] == [
+        "Ignoring invalid scope selectors ['main[', 'div[['] in scope_selectors_priority.",
+    ]
+
+
+@pytest.mark.parametrize("value", [None, 5, {"main": 1}, ["main", 5], ["main["]])
+def test_parse_scope_selectors_invalid(value, caplog):
+    """Values with no usable selector are logged and replaced by the default."""
+    with caplog.at_level(logging.ERROR):
+        assert script_to_test.parse_scope_selectors(value) == script_to_test.DEFAULT_SETTINGS["scope_selectors_priority"]
+    assert "Using the default" in caplog.text
+
+
+MOCK_YAML_CONTENT = 'settings:\n  input_file: "urls.txt"\n  request_timeout: 5\n'
+_EXPECTED_SETTINGS = script_to_test.yaml.safe_load(MOCK_YAML_CONTENT)["settings"]
+
+
+@pytest.fixture
+def clean_config_cache():
+    """Empties the configuration cache before and after a test."""
+    script_to_test.clear_config_cache()
+    yield
+    script_to_test.clear_config_cache()
+
+
+def test_load_configuration(tmp_path, clean_config_cache):
+    """Tests load_configuration reading a YAML file from disk."""
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(MOCK_YAML_CONTENT, encoding="utf-8")
+    settings = script_to_test.load_configuration(str(config_path))
+    assert settings == {**script_to_test.DEFAULT_SETTINGS, **_EXPECTED_SETTINGS}
+    assert settings["output_base_dir"] == script_to_test.DEFAULT_SETTINGS["output_base_dir"]
+    with pytest.raises(FileNotFoundError):
+        script_to_test.load_configuration(str(tmp_path / "missing.yaml"))
+    # Cached results are returned as independent copies
+    first = script_to_test.load_configuration(str(config_path))
+    first["input_file"] = "mutated.txt"
+    assert script_to_test.load_configuration(str(config_path))["input_file"] == _EXPECTED_SETTINGS["input_file"]
+    config_path.write_text("settings: [unclosed", encoding="utf-8")
+    with pytest.raises(script_to_test.yaml.YAMLError):
+        script_to_test.load_configuration(str(config_path))
+
+
+@pytest.fixture
+def mock_basic_config(monkeypatch):
+    """Captures logging.basicConfig calls without touching the real root logger."""
+    mock = MagicMock()
+    monkeypatch.setattr(script_to_test.logging, "basicConfig", mock)
+    return mock
+
+
+@pytest.mark.parametrize("level_str,expected", [
+    ("DEBUG", logging.DEBUG),
+    ("info", logging.INFO),
+    ("INVALID_LEVEL", logging.INFO),
+    ("BASIC_FORMAT", logging.INFO),  # Attribute of logging that is not a level
+])
+def test_setup_logging(mock_basic_config, level_str, expected):
+    """Tests for setup_logging function."""
+    assert script_to_test.setup_logging(level_str) == expected
+    mock_basic_config.assert_called_once()
+    assert mock_basic_config.call_args.kwargs["level"] == expected
+
+
+@pytest.mark.parametrize("url,expected", [
+    ("https://www.example.com/about-us/", "about-us"),
+    ("https://www.example.com/", "homepage"),
+    ("https://www.example.com", "homepage"),
+    ("https://www.example.com/blog/article", "article"),
+    ("https://www.example.com/index.html", "index.html"),
+    ("https://www.example.com/blog/post?page=2#comments", "post"),
+    ("https://www.example.com/shop/item;jsessionid=abc", "item"),  # ;params dropped like urlparse
+    ("item;jsessionid=abc", "item"),  # No slash in the path
+    ("svn+ssh://host/repo;x", "repo;x"),  # Scheme without ;params
+    ("http://[::1/x", "unknown"),  # Invalid IPv6 host
+])
+def test_extract_page_slug(url, expected):
     """Tests for extract_page_slug function."""
-    assert script_to_test.extract_page_slug("https://www.example.com/about-us/") == "about-us"
-    assert script_to_test.extract_page_slug("https://www.example.com/") == "homepage"
-    assert script_to_test.extract_page_slug("https://www.example.com/blog/article") == "article"
-    assert script_to_test.extract_page_slug("https://www.example.com/index.html") == "index.html"
+    assert script_to_test.extract_page_slug(url) == expected
 
 
-def test_extract_body_class():
+@pytest.fixture(scope="module")
+def body_class_soup():
+    """A single parsed body shared by all extract_body_class cases."""
+    return BeautifulSoup('<body class="page-id-123 parent-pageid-456"></body>', HTML_PARSER, parse_only=SoupStrainer("body"))
+
+
+@pytest.mark.parametrize("prefix,default,expected", [
+    ("page-id-", None, "123"),
+    ("parent-pageid-", "0", "456"),
+    ("nonexistent-", "None", "None"),
+    ("nonexistent-", None, None),
+    ("page-", None, "id-123"),  # Shorter dash prefix
+])
+def test_extract_body_class(body_class_soup, prefix, default, expected):
     """Tests for extract_body_class function."""
-    soup = BeautifulSoup('<body class="page-id-123 parent-pageid-456"></body>', "html.parser")
-    assert script_to_test.extract_body_class(soup, "page-id-") == "123"
-    assert script_to_test.extract_body_class(soup, "parent-pageid-", default="0") == "456"
-    assert script_to_test.extract_body_class(soup, "nonexistent-", default="None") == "None"
-    soup = BeautifulSoup('<body></body>', "html.parser")
+    assert script_to_test.extract_body_class(body_class_soup, prefix, default=default) == expected
+
+
+def test_extract_body_classes(body_class_soup):
+    """Tests for extract_body_classes function."""
+    prefix_defaults = {"page-id-": None, "parent-pageid-": "0", "nonexistent-": "fallback", "page-id": None}
+    assert script_to_test.extract_body_classes(body_class_soup, prefix_defaults) == {
+        "page-id-": "123", "parent-pageid-": "456", "nonexistent-": "fallback", "page-id": "-123",
+    }
+    soup = BeautifulSoup('<body></body>', HTML_PARSER)
+    assert script_to_test.extract_body_classes(soup, {"parent-pageid-": "0"}) == {"parent-pageid-": "0"}
+
+
+def test_extract_body_class_after_edit():
+    """The prefix index follows in-place edits to the body's class list."""
+    soup = BeautifulSoup('<body class="page-id-1"></body>', HTML_PARSER)
+    assert script_to_test.extract_body_class(soup, "parent-pageid-") is None
+    soup.body["class"].append("parent-pageid-2")
+    assert script_to_test.extract_body_class(soup, "parent-pageid-") == "2"
+    soup.body["class"] = ["page-id-3"]
+    assert script_to_test.extract_body_class(soup, "page-id-") == "3"
+
+
+def test_extract_body_class_no_class():
+    """Tests extract_body_class when the body has no class attribute."""
+    soup = BeautifulSoup('<body></body>', HTML_PARSER)
     assert script_to_test.extract_body_class(soup, "page-id-") is None
 
 
@@ -30,7 +179,7 @@ def test_extract_meta_content():
     """Tests for extract_meta_content function."""
     soup = BeautifulSoup(
         '<meta name="description" content="Test description"><meta property="og:image" content="test.jpg">',
-        "html.parser"
+        HTML_PARSER
     )
     assert script_to_test.extract_meta_content(soup, "description") == "Test description"
     assert script_to_test.extract_meta_content(soup, "og:image") == "test.jpg"
@@ -39,112 +188,459 @@ def test_extract_meta_content():
 
 def test_extract_meta_title():
     """Tests for extract_meta_title function."""
-    soup = BeautifulSoup('<title>Test Title</title>', "html.parser")
+    soup = BeautifulSoup('<title>Test Title</title>', HTML_PARSER)
     assert script_to_test.extract_meta_title(soup) == "Test Title"
-    soup = BeautifulSoup('<head></head>', "html.parser")
+    soup = BeautifulSoup('<head></head>', HTML_PARSER)
     assert script_to_test.extract_meta_title(soup) == ""
 
 
-def test_extract_h1():
+@pytest.fixture(scope="module")
+def empty_article_soup():
+    """An empty article shared by the zero-count cases; no test mutates it."""
+    return BeautifulSoup('<article></article>', HTML_PARSER)
+
+
+def test_extract_h1(empty_article_soup):
     """Tests for extract_h1 function."""
-    soup = BeautifulSoup('<article><h1>Main Heading</h1></article>', "html.parser")
+    soup = BeautifulSoup('<article><h1>Main Heading</h1></article>', HTML_PARSER)
     assert script_to_test.extract_h1(soup) == "Main Heading"
-    soup = BeautifulSoup('<div><h1>Main Heading</h1></div>', "html.parser")
+    assert script_to_test.extract_h1(soup, "ARTICLE") == "Main Heading"  # Tag-name scopes ignore case
+    soup = BeautifulSoup('<div><h1>Main Heading</h1></div>', HTML_PARSER)
     assert script_to_test.extract_h1(soup) == ""  # H1 not inside article
-    soup = BeautifulSoup('<article></article>', "html.parser")
-    assert script_to_test.extract_h1(soup) == ""
+    assert script_to_test.extract_h1(empty_article_soup) == ""
 
 
-def test_count_headings():
-    """Tests for count_headings function."""
-    soup = BeautifulSoup('<article><h1>H1</h1><h2>H2</h2><h3>H3</h3></article>', "html.parser")
-    assert script_to_test.count_headings(soup) == 3
-    soup = BeautifulSoup('<div><h1>H1</h1><h2>H2</h2></div>', "html.parser")
-    assert script_to_test.count_headings(soup) == 0  # Headings not in article
-    soup = BeautifulSoup('<article></article>', "html.parser")
-    assert script_to_test.count_headings(soup) == 0
+DEFAULT_PRIORITY = ("main", "div[role='main']", "article")
+# Scope discovery only looks at container tags; skip building the rest of the tree
+SCOPE_STRAINER = SoupStrainer(["main", "article", "div", "section"])
 
 
-def test_count_internal_links():
-    """Tests for count_internal_links function."""
-    soup = BeautifulSoup(
-        '<article><a href="https://www.example.com/page1"></a><a href="/page2"></a>'
-        '<a href="https://www.external.com"></a></article>',
-        "html.parser"
-    )
+@pytest.mark.parametrize("html,priority,expected", [
+    ('<main><article></article></main>', DEFAULT_PRIORITY, "main"),
+    ('<div role="main"></div><article></article>', DEFAULT_PRIORITY, "div[role='main']"),
+    ('<article></article><article></article>', DEFAULT_PRIORITY, "article"),
+    ('<div></div>', DEFAULT_PRIORITY, None),
+    ('<main></main><article></article>', ["article", "main"], "article"),
+    ('<main></main><section></section>', ["article", "section", "main"], "section"),  # Tag-name fast path
+    ('<article></article>', ["MAIN", "ARTICLE"], "ARTICLE"),  # Tag names are case-insensitive
+    ('<article></article>', ["article\n"], "article\n"),  # Not a bare tag name: matched by the CSS engine
+])
+def test_find_content_scope(html, priority, expected):
+    """Tests for find_content_scope function."""
+    soup = BeautifulSoup(html, HTML_PARSER, parse_only=SCOPE_STRAINER)
+    assert script_to_test.find_content_scope(soup, priority_list=priority) == expected
+
+
+def test_count_headings(empty_article_soup):
+    """Tests for count_tags function with heading tags."""
+    headings = ["h1", "h2", "h3", "h4", "h5", "h6"]
+    soup = BeautifulSoup('<article><h1>H1</h1><h2>H2</h2><h3>H3</h3></article>', HTML_PARSER)
+    assert script_to_test.count_tags(soup, headings) == 3
+    soup = BeautifulSoup('<div><h1>H1</h1><h2>H2</h2></div>', HTML_PARSER)
+    assert script_to_test.count_tags(soup, headings) == 0  # Headings not in article
+    assert script_to_test.count_tags(empty_article_soup, headings) == 0
+
+
+LINKS_HTML = (
+    '<article><a href="https://www.example.com/page1"></a><a href="/page2"></a>'
+    '<a href="https://www.external.com"></a><a href="#top"></a><a href="mailto:a@b.com"></a></article>'
+)
+
+
+@pytest.fixture(scope="module")
+def links_soup():
+    """LINKS_HTML parsed once for the internal and external link counts."""
+    return BeautifulSoup(LINKS_HTML, HTML_PARSER)
+
+
+def test_count_internal_links(links_soup, empty_article_soup):
+    """Tests for count_links function (internal)."""
     base_url = "https://www.example.com"
-    assert script_to_test.count_internal_links(soup, base_url) == 2
-    soup = BeautifulSoup('<article></article>', "html.parser")
-    assert script_to_test.count_internal_links(soup, base_url) == 0
+    assert script_to_test.count_links(links_soup, base_url, internal=True) == 2
+    assert script_to_test.count_links(empty_article_soup, base_url, internal=True) == 0
 
 
-def test_count_external_links():
-    """Tests for count_external_links function."""
-    soup = BeautifulSoup(
-        '<article><a href="https://www.example.com/page1"></a><a href="/page2"></a>'
-        '<a href="https://www.external.com"></a></article>',
-        "html.parser"
-    )
+def test_count_external_links(links_soup, empty_article_soup):
+    """Tests for count_links function (external)."""
     base_url = "https://www.example.com"
-    assert script_to_test.count_external_links(soup, base_url) == 1
-    soup = BeautifulSoup('<article></article>', "html.parser")
-    assert script_to_test.count_external_links(soup, base_url) == 0
+    assert script_to_test.count_links(links_soup, base_url, internal=False) == 1
+    assert script_to_test.count_links(empty_article_soup, base_url, internal=False) == 0
 
 
-def test_count_images():
-    """Tests for count_images function."""
-    soup = BeautifulSoup('<article><img src="1.jpg"><img src="2.jpg"></article>', "html.parser")
-    assert script_to_test.count_images(soup) == 2
-    soup = BeautifulSoup('<article></article>', "html.parser")
-    assert script_to_test.count_images(soup) == 0
+def test_count_images(empty_article_soup):
+    """Tests for count_tags function with img tags."""
+    soup = BeautifulSoup('<article><img src="1.jpg"><img src="2.jpg"></article>', HTML_PARSER)
+    assert script_to_test.count_tags(soup, ["img"]) == 2
+    assert script_to_test.count_tags(empty_article_soup, ["img"]) == 0
 
 
-def test_count_images_no_alt():
+def test_count_images_no_alt(empty_article_soup):
     """Tests for count_images_no_alt function."""
     soup = BeautifulSoup(
         '<article><img src="1.jpg"><img src="2.jpg" alt="Alt text"><img src="3.jpg"></article>',
-        "html.parser"
+        HTML_PARSER
     )
     assert script_to_test.count_images_no_alt(soup) == 2
-    soup = BeautifulSoup('<article><img src="1.jpg" alt=""></article>', "html.parser")
+    soup = BeautifulSoup('<article><img src="1.jpg" alt=""></article>', HTML_PARSER)
     assert script_to_test.count_images_no_alt(soup) == 1
-    soup = BeautifulSoup('<article></article>', "html.parser")
-    assert script_to_test.count_images_no_alt(soup) == 0
-
-
-@patch('requests.head')
-def test_fetch_http_status_and_type(mock_head):
-    """Tests for fetch_http_status_and_type function."""
-
-    # Mock a successful response
-    mock_head.return_value.status_code = 200
-    mock_head.return_value.headers = {"Content-Type": "text/html; charset=utf-8"}
-    code, content_type = script_to_test.fetch_http_status_and_type("http://example.com")
-    assert code == 200
-    assert content_type == "text/html"
-
-    # Mock a 404 response
-    mock_head.return_value.status_code = 404
-    mock_head.return_value.headers = {"Content-Type": "text/plain"}
-    code, content_type = script_to_test.fetch_http_status_and_type("http://example.com/missing")
-    assert code == 404
-    assert content_type == "text/plain"
-
-    # Mock an SSL error (this part might need adjusting based on your error handling)
-    mock_head.side_effect = requests.exceptions.SSLError("SSL Error")
-    code, content_type = script_to_test.fetch_http_status_and_type("https://invalid-ssl.com")
-    assert code == "SSL Error"  # Or your specific SSL error code
-    assert content_type == "Unknown"
-
-    # Mock a general request exception
-    mock_head.side_effect = requests.exceptions.RequestException("Request Exception")
-    code, content_type = script_to_test.fetch_http_status_and_type("http://bad-url")
-    assert code == "Unknown"
-    assert content_type == "Unknown"
-
-
-# You would add tests for read_input_file, sanitise_domain, and write_to_csv similarly
-# (and any other functions you have)
+    assert script_to_test.count_images_no_alt(empty_article_soup) == 0
+
+
+def test_gather_article_stats():
+    """Tests gather_article_stats against the individual extractors."""
+    html = (
+        '<h1>Outside</h1><article><h1> Main Heading </h1><h2>Sub</h2>'
+        '<a href="https://www.example.com/page1"></a><a href="/page2"></a><a href="https://www.external.com"></a>'
+        '<a href="#top"></a><a>No href</a><img src="1.jpg"><img src="2.jpg" alt="Alt text"><img src="3.jpg" alt=" "></article>'
+    )
+    soup = BeautifulSoup(html, HTML_PARSER)
+    base_url = "https://www.example.com"
+    assert script_to_test.gather_article_stats(soup, base_url) == {
+        "Article H1": "Main Heading",
+        "Article Headings": 2,
+        "Article Links Internal": 2,
+        "Article Links External": 1,
+        "Article Images": 3,
+        "Article Images NoAlt": 2,
+    }
+    assert script_to_test.gather_article_stats(soup, base_url)["Article H1"] == script_to_test.extract_h1(soup)
+    assert script_to_test.gather_article_stats(soup, base_url, "ARTICLE") == script_to_test.gather_article_stats(soup, base_url)
+    assert script_to_test.count_links(soup, base_url, internal=True) == 2
+    soup = BeautifulSoup('<div><h1>H1</h1></div>', HTML_PARSER)
+    assert script_to_test.gather_article_stats(soup, base_url)["Article Headings"] == 0  # No article scope
+
+
+class StubAdapter(HTTPAdapter):
+    """
+    Transport adapter that answers requests from a URL -> outcome table.
+
+    An outcome is a (status_code, headers) tuple or an exception to raise. A list
+    of outcomes is consumed one per request, to script retries. Every request
+    received is recorded in `sent`.
+    """
+
+    def __init__(self, routes):
+        super().__init__()
+        self.routes = routes
+        self.sent = []
+
+    def send(self, request, **kwargs):
+        self.sent.append(request)
+        outcome = self.routes[request.url]
+        if isinstance(outcome, list):
+            outcome = outcome.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        status_code, headers = outcome
+        response = requests.Response()
+        response.status_code = status_code
+        response.headers.update(headers)
+        response.url = request.url
+        response.request = request
+        # Expose the headers the way urllib3 does, so the session sees any Set-Cookie
+        message = http.client.HTTPMessage()
+        for name, value in headers.items():
+            message[name] = value
+        response.raw = SimpleNamespace(_original_response=SimpleNamespace(msg=message))
+        response._content = b""  # HEAD responses have no body
+        return response
+
+
+@pytest.fixture
+def stub_session(monkeypatch):
+    """Swaps the module's HTTP session for one served by a StubAdapter, with an empty probe cache."""
+    session = requests.Session()
+    session.cookies.set_policy(script_to_test.HTTP_SESSION.cookies.get_policy())
+    adapter = StubAdapter({})
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    monkeypatch.setattr(script_to_test, "HTTP_SESSION", session)
+    script_to_test.clear_probe_cache()
+    yield adapter
+    script_to_test.clear_probe_cache()
+
+
+MAX_RETRIES = script_to_test.DEFAULT_SETTINGS["request_max_retries"]
+_EXPECTED_BACKOFF = [2 ** attempt for attempt in range(MAX_RETRIES - 1)]
+
+
+@pytest.mark.parametrize("outcome,expected,sleeps", [
+    pytest.param((200, {"Content-Type": "text/html; charset=utf-8"}), (200, "text/html"), [], id="ok"),
+    pytest.param((404, {"Content-Type": "text/plain"}), (404, "text/plain"), [], id="not-found"),
+    pytest.param(requests.exceptions.RequestException("down"), (None, "Request Error"), _EXPECTED_BACKOFF, id="request-error"),
+    pytest.param(
+        [requests.exceptions.ConnectionError("reset"), (200, {"Content-Type": "text/html"})],
+        (200, "text/html"), _EXPECTED_BACKOFF[:1], id="recovers",
+    ),
+    pytest.param(ValueError("unexpected"), (None, "Unknown Error"), _EXPECTED_BACKOFF, id="unknown-error"),
+])
+def test_fetch_http_status_and_type(stub_session, outcome, expected, sleeps):
+    """Tests fetch_http_status_and_type results and backoff for each transport outcome."""
+    stub_session.routes["http://example.com/"] = list(outcome) if isinstance(outcome, list) else outcome
+    recorded = []
+    assert script_to_test.fetch_http_status_and_type("http://example.com", {}, max_retries=MAX_RETRIES, _sleep=recorded.append) == expected
+    assert recorded == sleeps
+
+
+def test_fetch_http_status_and_type_headers_and_cache(stub_session):
+    """The probe asks for HTML and answers repeated URLs from its cache."""
+    stub_session.routes["http://example.com/"] = (200, {"Content-Type": "text/html"})
+    assert script_to_test.fetch_http_status_and_type("http://example.com", {}) == (200, "text/html")
+    assert stub_session.sent[0].headers["Accept"] == "text/html,application/xhtml+xml"
+    assert script_to_test.fetch_http_status_and_type("http://example.com", {}) == (200, "text/html")
+    assert len(stub_session.sent) == 1  # Repeat served from the probe cache
+
+
+@pytest.mark.parametrize("status,probes", [
+    pytest.param(404, 1, id="not-found-cached"),
+    pytest.param(408, 2, id="timeout-reprobed"),
+    pytest.param(429, 2, id="rate-limited-reprobed"),
+    pytest.param(503, 2, id="unavailable-reprobed"),
+])
+def test_fetch_http_status_and_type_cache_transient(stub_session, status, probes):
+    """Permanent answers are cached; transient statuses are probed again on the next call."""
+    stub_session.routes["http://example.com/"] = [(status, {"Content-Type": "text/html"})] * 2
+    for _ in range(2):
+        assert script_to_test.fetch_http_status_and_type("http://example.com", {}) == (status, "text/html")
+    assert len(stub_session.sent) == probes
+
+
+def test_fetch_http_status_and_type_cache_bounded(stub_session, monkeypatch):
+    """The probe cache drops its oldest entry once it holds PROBE_CACHE_MAX_ENTRIES results."""
+    monkeypatch.setattr(script_to_test, "PROBE_CACHE_MAX_ENTRIES", 1)
+    for path in ("a", "b"):
+        stub_session.routes[f"http://example.com/{path}"] = (200, {"Content-Type": "text/html"})
+    for path in ("a", "b", "b", "a"):
+        script_to_test.fetch_http_status_and_type(f"http://example.com/{path}", {})
+    assert [request.url.rpartition("/")[2] for request in stub_session.sent] == ["a", "b", "a"]
+
+
+def test_fetch_http_status_and_type_no_cookies(stub_session):
+    """Cookies set by one probe are not sent with later probes."""
+    stub_session.routes.update({
+        "http://example.com/": (200, {"Content-Type": "text/html", "Set-Cookie": "session=abc; Path=/"}),
+        "http://example.com/next": (200, {"Content-Type": "text/html"}),
+    })
+    script_to_test.fetch_http_status_and_type("http://example.com", {})
+    script_to_test.fetch_http_status_and_type("http://example.com/next", {})
+    assert "Cookie" not in stub_session.sent[1].headers
+
+
+def test_fetch_http_status_and_type_not_acceptable(stub_session):
+    """A 406 answer to the HTML Accept header is re-probed without it, so the real status is reported."""
+    stub_session.routes["http://example.com/file.pdf"] = [
+        (406, {"Content-Type": "text/plain"}),
+        (200, {"Content-Type": "application/pdf"}),
+    ]
+    assert script_to_test.fetch_http_status_and_type("http://example.com/file.pdf", {}) == (200, "application/pdf")
+    assert [request.headers["Accept"] for request in stub_session.sent] == ["text/html,application/xhtml+xml", "*/*"]
+
+
+def test_fetch_http_status_and_type_ssl(stub_session, monkeypatch):
+    """Tests the interactive SSL skip prompt."""
+    answers = iter(["n", "y"])
+    monkeypatch.setattr("builtins.input", lambda _prompt: next(answers))
+    stub_session.routes.update({
+        "https://invalid-ssl.com/": requests.exceptions.SSLError("SSL Error"),
+        "https://self-signed.com/": [
+            requests.exceptions.SSLError("SSL Error"),
+            (200, {"Content-Type": "text/html"}),
+        ],
+    })
+
+    # SSL error where the user declines to skip verification
+    assert script_to_test.fetch_http_status_and_type("https://invalid-ssl.com", {}) == (None, "SSL Error (User Declined Skip)")
+
+    # SSL error where the user agrees to skip verification, then the retry succeeds without verification
+    ssl_decision = {}
+    assert script_to_test.fetch_http_status_and_type("https://self-signed.com", ssl_decision) == (200, "text/html")
+    assert ssl_decision == {"skip_all": True}
+    assert [request.url for request in stub_session.sent] == [
+        "https://invalid-ssl.com/", "https://self-signed.com/", "https://self-signed.com/",
+    ]
+
+
+PAGE_HTML = (
+    '<html><head><title>About Us</title><meta name="description" content="Who we are">'
+    '<meta property="og:type" content="article"></head>'
+    '<body class="page page-id-42 parent-pageid-7"><main><h1>About</h1><h2>Team</h2>'
+    '<a href="/contact"></a><a href="https://other.org/"></a><img src="a.jpg"></main></body></html>'
+)
+
+
+class FakeDriver:
+    """
+    Minimal stand-in for a Selenium driver that has already rendered PAGE_HTML.
+
+    No JavaScript runs: the readyState script answers 'complete' and the network-idle
+    script answers `network_idle` (or raises it, if it is an exception), so only the
+    Python side of the waits is tested.
+    """
+
+    page_source = PAGE_HTML
+
+    def __init__(self, network_idle=True):
+        self.visited = []
+        self.network_idle = network_idle
+
+    def get(self, url):
+        self.visited.append(url)
+
+    def execute_script(self, script):
+        if "readyState" in script:
+            return "complete"
+        if isinstance(self.network_idle, Exception):
+            raise self.network_idle
+        return self.network_idle
+
+
+def test_fetch_and_parse_html(monkeypatch):
+    """Tests fetch_and_parse_html parsing the rendered page and reusing the driver's waits."""
+    def no_sleep(_seconds):
+        raise AssertionError("fetch_and_parse_html should not sleep once the page is idle")
+
+    monkeypatch.setattr(script_to_test.time, "sleep", no_sleep)
+    driver = FakeDriver()
+    soup = script_to_test.fetch_and_parse_html("https://www.example.com/about/", driver)
+    assert script_to_test.extract_meta_title(soup) == "About Us"
+    waits = dict(driver._driver_waits)
+    assert set(waits) == {30, 1.0}  # Page load and network settle
+    assert script_to_test.fetch_and_parse_html("https://www.example.com/team/", driver) is not None
+    assert driver._driver_waits == waits  # Same timeouts: waits reused
+    assert driver.visited == ["https://www.example.com/about/", "https://www.example.com/team/"]
+
+
+@pytest.mark.parametrize("network_idle", [
+    pytest.param(False, id="never-idle"),
+    pytest.param(JavascriptException("context destroyed"), id="idle-check-fails"),
+])
+def test_fetch_and_parse_html_network_busy(monkeypatch, network_idle):
+    """A complete page is still parsed when the settle wait runs out or its idle check fails."""
+    monkeypatch.setattr(script_to_test.time, "sleep", lambda _seconds: None)
+    soup = script_to_test.fetch_and_parse_html("https://www.example.com/", FakeDriver(network_idle), settle_timeout=0)
+    assert script_to_test.extract_meta_title(soup) == "About Us"
+
+
+EXPECTED_KEYS = frozenset(script_to_test.CSV_FIELDNAMES)
+# fetch_and_parse_html is stubbed, so the driver is only forwarded, never used
+DRIVER = object()
+
+
+@pytest.fixture(scope="module")
+def page_soup():
+    """PAGE_HTML parsed once; extract_metadata only reads the tree."""
+    return BeautifulSoup(PAGE_HTML, HTML_PARSER)
+
+
+@pytest.fixture
+def metadata_stubs(monkeypatch, page_soup):
+    """Replaces extract_metadata's network collaborators in one place and returns the mocks."""
+    stubs = SimpleNamespace(
+        fetch_status=MagicMock(return_value=(200, "text/html")),
+        fetch_html=MagicMock(return_value=page_soup),
+    )
+    monkeypatch.setattr(script_to_test, "fetch_http_status_and_type", stubs.fetch_status)
+    monkeypatch.setattr(script_to_test, "fetch_and_parse_html", stubs.fetch_html)
+    return stubs
+
+
+@pytest.mark.parametrize("priority,article_stats", [
+    (("main", "article"), ("About", 2, 1, 1, 1)),
+    (("article",), ("", 0, 0, 0, 0)),  # No scope found: falls back to "article", which the page lacks
+])
+def test_extract_metadata(metadata_stubs, monkeypatch, priority, article_stats):
+    """Tests extract_metadata combining the extractors for an HTML page."""
+    monkeypatch.setattr(script_to_test, "SCOPE_SELECTORS_PRIORITY", priority)
+    ssl_decision = {}
+    data = script_to_test.extract_metadata("https://www.example.com/about/", DRIVER, ssl_decision)
+    metadata_stubs.fetch_status.assert_called_once_with("https://www.example.com/about/", ssl_decision=ssl_decision)
+    metadata_stubs.fetch_html.assert_called_once_with("https://www.example.com/about/", DRIVER)
+    assert data.keys() == EXPECTED_KEYS  # Exactly the CSV columns, nothing stray
+    assert {key: data[key] for key in ("http-code", "page-slug", "Title", "Description", "Opengraph type", "IA error")} == {
+        "http-code": 200, "page-slug": "about", "Title": "About Us", "Description": "Who we are",
+        "Opengraph type": "article", "IA error": "",
+    }
+    assert (data["Page-id"], data["Parent-ID"]) == ("42", "7")
+    assert tuple(data[key] for key in (
+        "Article H1", "Article Headings", "Article Images", "Article Links Internal", "Article Links External",
+    )) == article_stats
+
+
+@pytest.mark.parametrize("status,ia_error,rendered", [
+    pytest.param((200, "application/pdf"), "", False, id="non-html"),
+    pytest.param((None, "Request Error"), "Request Error", False, id="head-fails"),
+    pytest.param((None, "SSL Error"), "SSL Error", False, id="ssl-error"),
+    pytest.param((None, "SSL Error (User Declined Skip)"), "SSL Error (User Declined Skip)", False, id="ssl-declined"),
+    pytest.param((200, "text/html"), "Failed to fetch/parse HTML", True, id="render-fails"),
+])
+def test_extract_metadata_without_html(metadata_stubs, status, ia_error, rendered):
+    """Tests extract_metadata returning the basic row when there is no HTML to parse."""
+    metadata_stubs.fetch_status.return_value = status
+    metadata_stubs.fetch_html.return_value = None
+    data = script_to_test.extract_metadata("https://www.example.com/file", DRIVER, {})
+    assert metadata_stubs.fetch_html.called is rendered
+    assert data.keys() == EXPECTED_KEYS
+    assert (data["http-code"], data["http-type"]) == status
+    assert data["IA error"] == ia_error
+    assert (data["Title"], data["Article Headings"], data["Page-id"]) == ("", 0, None)
+
+
+def test_read_input_file(monkeypatch):
+    """Tests for read_input_file function with an injected in-memory opener."""
+    content = "https://example.com\n\nftp://files.example.com\nnot a url\n  http://test.org/page  \n"
+    files = {"real_path.txt": content}
+
+    def fake_open(path, *_args, **_kwargs):
+        if path not in files:
+            raise FileNotFoundError(path)
+        return io.StringIO(files[path])
+
+    urls = script_to_test.read_input_file("real_path.txt", _open=fake_open)
+    assert urls == ["https://example.com", "http://test.org/page"]
+
+    # Missing file: the user is prompted until a readable path is given
+    answers = iter(["also_missing.txt", "real_path.txt"])
+    monkeypatch.setattr("builtins.input", lambda _prompt="": next(answers))
+    assert script_to_test.read_input_file("missing.txt", _open=fake_open) == urls
+
+    # Missing file and an empty answer gives up with no URLs
+    monkeypatch.setattr("builtins.input", lambda _prompt="": "")
+    assert script_to_test.read_input_file("missing.txt", _open=fake_open) == []
+
+
+@pytest.mark.parametrize("url,expected", [
+    ("https://www.example.com/page", "www_example_com"),
+    ("http://localhost:8080/", "localhost_8080"),
+    ("https://sub.my-site.co.uk", "sub_my-site_co_uk"),
+    ("not a url", "unknown_domain"),
+    ("", "unknown_domain"),
+])
+def test_sanitise_domain(url, expected):
+    """Tests for sanitise_domain function."""
+    assert script_to_test.sanitise_domain(url) == expected
+
+
+@pytest.fixture(scope="module")
+def out_dir(tmp_path_factory):
+    """One output directory shared by the file-writing tests in this module."""
+    return tmp_path_factory.mktemp("out")
+
+
+def test_write_to_csv(out_dir):
+    """Tests for write_to_csv function."""
+    file_path = out_dir / "nested" / "test_output.csv"  # write_to_csv creates missing directories
+    data = [
+        {"col1": "a", "col2": 1, "extra": True},  # Extra key is ignored
+        {"col1": "b"},  # Missing key is written blank
+    ]
+    script_to_test.write_to_csv(str(file_path), data, ["col1", "col2"])
+    with open(file_path, newline="", encoding="utf-8") as f:
+        assert list(csv.reader(f)) == [["col1", "col2"], ["a", "1"], ["b", ""]]
+
+    single_path = out_dir / "single.csv"
+    script_to_test.write_to_csv(str(single_path), data, ["col1"])
+    assert single_path.read_text(encoding="utf-8").splitlines() == ["col1", "a", "b"]
+
 
 if __name__ == '__main__':
     pytest.main()
\ No newline at end of file